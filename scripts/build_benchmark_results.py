@@ -1,16 +1,30 @@
 #!/usr/bin/env python3
 
 import csv
+import io
+import os
+import re
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 
-EXCLUDED_BENCHES = {
-    "FSSZ-INT-01",
-    "FSSZ-222",
-    "FSSZ-INT-02",
-    "FSSZ-INT-03",
-}
+IO_BUFFER_SIZE = 1 << 20
+NA = "n/a"
+_EMPTY: dict = {}
+
+# Characters that force csv.writer to quote a field; rows without them (and
+# without embedded delimiters) are joined directly.
+CSV_SPECIAL_RE = re.compile(r'["\r\n]')
+
+EXCLUDED_BENCHES = frozenset(
+    {
+        "FSSZ-INT-01",
+        "FSSZ-222",
+        "FSSZ-INT-02",
+        "FSSZ-INT-03",
+    }
+)
 
 CROSS_CLIENT_META = {
     "BV-DirtyPadding": {
@@ -282,64 +296,121 @@ FUZZ_VARIANT_META = {
 }
 
 
+OUTPUT_FIELDNAMES = (
+    "benchmark_id",
+    "suite",
+    "category",
+    "bench_schema",
+    "ssz_schema",
+    "target",
+    "bug_class",
+    "patch",
+    "reference",
+    "data_source",
+    "regression_stage",
+    "full_result",
+    "full_tte_ms",
+    "full_coverage",
+    "full_step",
+    "norl_result",
+    "norl_tte_ms",
+    "norl_coverage",
+    "norl_step",
+    "nospec_result",
+    "nospec_tte_ms",
+    "nospec_coverage",
+    "nospec_step",
+)
+
+ABLATION_COLUMNS = (
+    "benchmark",
+    "category",
+    "schema",
+    "mode_label",
+    "result",
+    "duration_ms",
+    "coverage",
+    "step",
+)
+
+
 def load_ablation_results(path: Path) -> tuple[list[str], dict[str, dict]]:
     order: list[str] = []
     results: dict[str, dict] = {}
-    with path.open(newline="") as f:
-        reader = csv.DictReader(f)
+    with path.open("r", newline="", buffering=IO_BUFFER_SIZE) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        # Missing columns point one past the header so padded rows read "".
+        width = len(header) + 1
+        i_bench, i_category, i_schema, i_mode_label, i_result, i_duration, i_coverage, i_step = (
+            header.index(name) if name in header else len(header) for name in ABLATION_COLUMNS
+        )
         for row in reader:
-            bench = (row.get("benchmark") or "").strip()
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            bench = row[i_bench].strip()
             if not bench:
                 continue
-            if bench not in results:
-                results[bench] = {
-                    "category": (row.get("category") or "").strip(),
-                    "bench_schema": (row.get("schema") or "").strip(),
+            category = row[i_category].strip()
+            bench_schema = row[i_schema].strip()
+            entry = results.get(bench)
+            if entry is None:
+                entry = results[bench] = {
+                    "category": category,
+                    "bench_schema": bench_schema,
                     "modes": {},
                 }
                 order.append(bench)
-            if not results[bench]["category"] and row.get("category"):
-                results[bench]["category"] = (row.get("category") or "").strip()
-            if not results[bench]["bench_schema"] and row.get("schema"):
-                results[bench]["bench_schema"] = (row.get("schema") or "").strip()
-            mode_label = (row.get("mode_label") or "").strip()
+            if not entry["category"] and category:
+                entry["category"] = category
+            if not entry["bench_schema"] and bench_schema:
+                entry["bench_schema"] = bench_schema
+            mode_label = row[i_mode_label].strip()
             if mode_label:
-                results[bench]["modes"][mode_label] = {
-                    "result": (row.get("result") or "").strip(),
-                    "tte_ms": (row.get("duration_ms") or "").strip(),
-                    "coverage": (row.get("coverage") or "").strip(),
-                    "step": (row.get("step") or "").strip(),
+                entry["modes"][mode_label] = {
+                    "result": row[i_result].strip(),
+                    "tte_ms": row[i_duration].strip(),
+                    "coverage": row[i_coverage].strip(),
+                    "step": row[i_step].strip(),
                 }
     return order, results
 
 
+BUG_CLASS_RULES = (
+    (("sszgen", "codegen", "generator"), "Codegen"),
+    (("merkle",), "Merkleization"),
+    (("htr",), "HTR"),
+    (("proof",), "Proofs"),
+    (("decode", "offset", "bitlist"), "Decoding"),
+    (("size", "encode"), "Encoding"),
+)
+
+CODEGEN_SECTION_KEYWORDS = ("sszgen", "code generation")
+MERKLE_SECTION_KEYWORDS = ("merkleization", "proof", "htr")
+CANONICAL_BUG_KEYWORDS = ("dirty", "canonical")
+
+
+@lru_cache(maxsize=None)
 def component_from_bug_class(bug_class: str) -> str:
     lower = bug_class.lower()
-    if "sszgen" in lower or "codegen" in lower or "generator" in lower:
-        return "Codegen"
-    if "merkle" in lower:
-        return "Merkleization"
-    if "htr" in lower:
-        return "HTR"
-    if "proof" in lower:
-        return "Proofs"
-    if "decode" in lower or "offset" in lower or "bitlist" in lower:
-        return "Decoding"
-    if "size" in lower or "encode" in lower:
-        return "Encoding"
+    for keywords, label in BUG_CLASS_RULES:
+        if any(k in lower for k in keywords):
+            return label
     return "Runtime"
 
 
+@lru_cache(maxsize=None)
 def component_from_section(section: str, bug_class: str) -> str:
     lower = section.lower()
-    bug_lower = bug_class.lower()
-    if "sszgen" in lower or "code generation" in lower:
+    if any(k in lower for k in CODEGEN_SECTION_KEYWORDS):
         return "Codegen"
     if "canonicalization" in lower:
-        if "dirty" in bug_lower or "canonical" in bug_lower:
+        bug_lower = bug_class.lower()
+        if any(k in bug_lower for k in CANONICAL_BUG_KEYWORDS):
             return "Canonicalization"
         return "Decoding"
-    if "merkleization" in lower or "proof" in lower or "htr" in lower:
+    if any(k in lower for k in MERKLE_SECTION_KEYWORDS):
+        bug_lower = bug_class.lower()
         if "htr" in bug_lower:
             return "HTR"
         if "proof" in bug_lower:
@@ -348,31 +419,32 @@ def component_from_section(section: str, bug_class: str) -> str:
     return component_from_bug_class(bug_class)
 
 
+# Table rows whose first cell is a fastssz benchmark id; header and separator
+# rows never match, so only candidate rows get split.
+FSSZ_ROW_RE = re.compile(r"\s*\|+\s*FSSZ-")
+
+
 def parse_fastssz_metadata(path: Path) -> dict[str, dict]:
     meta: dict[str, dict] = {}
-    if not path.exists():
+    try:
+        f = path.open("r", buffering=IO_BUFFER_SIZE)
+    except FileNotFoundError:
         return meta
     section = ""
-    with path.open() as f:
+    with f:
         for line in f:
             if line.startswith("##"):
                 section = line.strip()
                 continue
-            if not line.lstrip().startswith("|"):
+            if FSSZ_ROW_RE.match(line) is None:
                 continue
-            parts = [p.strip() for p in line.strip().strip("|").split("|")]
+            parts = line.strip().strip("|").split("|", 4)
             if len(parts) < 4:
                 continue
-            if parts[0].lower().startswith("benchmark id"):
-                continue
-            if set(parts[0]) <= {"-"}:
-                continue
-            bench = parts[0]
-            if not bench.startswith("FSSZ-"):
-                continue
-            bug_class = parts[1]
-            patch = parts[2].strip("`")
-            reference = parts[3].strip("`")
+            bench = parts[0].strip()
+            bug_class = parts[1].strip()
+            patch = parts[2].strip().strip("`")
+            reference = parts[3].strip().strip("`")
             meta[bench] = {
                 "suite": "benchmark",
                 "target": component_from_section(section, bug_class),
@@ -384,6 +456,62 @@ def parse_fastssz_metadata(path: Path) -> dict[str, dict]:
     return meta
 
 
+def _write_rows(out: io.StringIO, order: list[str], ablation_get, meta_get) -> list[str]:
+    # Hot loop: everything it touches is bound to a local up front.
+    na = NA
+    empty = _EMPTY
+    write = out.write
+    writerow = csv.writer(out).writerow
+    needs_quoting = CSV_SPECIAL_RE.search
+    missing_meta: list[str] = []
+    writerow(OUTPUT_FIELDNAMES)
+    for bench in order:
+        bench_data = ablation_get(bench, empty)
+        category = bench_data.get("category", "")
+        bench_schema = bench_data.get("bench_schema", "")
+        modes = bench_data.get("modes", empty)
+        meta = meta_get(bench)
+        if meta is None:
+            meta = empty
+            missing_meta.append(bench)
+        get = meta.get
+        m_full = modes.get("full", empty)
+        m_norl = modes.get("norl", empty)
+        m_nospec = modes.get("nospec", empty)
+        # Positional row; keep in sync with OUTPUT_FIELDNAMES.
+        row = [
+            bench,
+            get("suite") or na,
+            category or na,
+            bench_schema or na,
+            get("ssz_schema") or na,
+            get("target") or na,
+            get("bug_class") or na,
+            get("patch") or na,
+            get("reference") or na,
+            "ablation",
+            na,
+            m_full.get("result", na),
+            m_full.get("tte_ms", na),
+            m_full.get("coverage", na),
+            m_full.get("step", na),
+            m_norl.get("result", na),
+            m_norl.get("tte_ms", na),
+            m_norl.get("coverage", na),
+            m_norl.get("step", na),
+            m_nospec.get("result", na),
+            m_nospec.get("tte_ms", na),
+            m_nospec.get("coverage", na),
+            m_nospec.get("step", na),
+        ]
+        line = ",".join(row)
+        if line.count(",") == len(row) - 1 and needs_quoting(line) is None:
+            write(line + "\r\n")
+        else:
+            writerow(row)
+    return missing_meta
+
+
 def main() -> int:
     repo_root = Path(__file__).resolve().parents[1]
     ablation_path = repo_root / "ablation_results.csv"
@@ -395,83 +523,28 @@ def main() -> int:
         return 1
 
     order, ablation = load_ablation_results(ablation_path)
+    order = [b for b in order if b not in EXCLUDED_BENCHES]
     fastssz_meta = parse_fastssz_metadata(fastssz_meta_path)
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    fieldnames = [
-        "benchmark_id",
-        "suite",
-        "category",
-        "bench_schema",
-        "ssz_schema",
-        "target",
-        "bug_class",
-        "patch",
-        "reference",
-        "data_source",
-        "regression_stage",
-        "full_result",
-        "full_tte_ms",
-        "full_coverage",
-        "full_step",
-        "norl_result",
-        "norl_tte_ms",
-        "norl_coverage",
-        "norl_step",
-        "nospec_result",
-        "nospec_tte_ms",
-        "nospec_coverage",
-        "nospec_step",
-    ]
-
-    missing_meta = []
-
-    with out_path.open("w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for bench in order:
-            if bench in EXCLUDED_BENCHES:
-                continue
-            bench_data = ablation.get(bench, {})
-            category = bench_data.get("category", "")
-            bench_schema = bench_data.get("bench_schema", "")
-            modes = bench_data.get("modes", {})
-            meta = CROSS_CLIENT_META.get(bench)
-            if meta is None:
-                meta = FUZZ_VARIANT_META.get(bench)
-            if meta is None:
-                meta = fastssz_meta.get(bench)
-            if meta is None:
-                meta = {}
-                missing_meta.append(bench)
-            row = {
-                "benchmark_id": bench,
-                "suite": meta.get("suite") or "n/a",
-                "category": category or "n/a",
-                "bench_schema": bench_schema or "n/a",
-                "ssz_schema": meta.get("ssz_schema") or "n/a",
-                "target": meta.get("target") or "n/a",
-                "bug_class": meta.get("bug_class") or "n/a",
-                "patch": meta.get("patch") or "n/a",
-                "reference": meta.get("reference") or "n/a",
-                "regression_stage": "n/a",
-            }
+    merged_meta: dict[str, dict] = {}
+    merged_meta.update(fastssz_meta)
+    merged_meta.update(FUZZ_VARIANT_META)
+    merged_meta.update(CROSS_CLIENT_META)
 
-            row["data_source"] = "ablation"
-            for label in ["full", "norl", "nospec"]:
-                m = modes.get(label, {})
-                row[f"{label}_result"] = m.get("result", "n/a")
-                row[f"{label}_tte_ms"] = m.get("tte_ms", "n/a")
-                row[f"{label}_coverage"] = m.get("coverage", "n/a")
-                row[f"{label}_step"] = m.get("step", "n/a")
+    buf = io.StringIO(newline="")
+    missing_meta = _write_rows(buf, order, ablation.get, merged_meta.get)
 
-            writer.writerow(row)
+    # Write next to the target and swap it in so readers never see a partial file.
+    tmp_path = out_path.with_suffix(out_path.suffix + ".tmp")
+    tmp_path.write_text(buf.getvalue(), newline="")
+    os.replace(tmp_path, out_path)
 
     if missing_meta:
-        print(f"warning: missing metadata for {len(missing_meta)} benchmarks:", file=sys.stderr)
-        for bench in missing_meta:
-            print(f"  - {bench}", file=sys.stderr)
+        lines = [f"warning: missing metadata for {len(missing_meta)} benchmarks:"]
+        lines.extend(f"  - {bench}" for bench in missing_meta)
+        sys.stderr.write("\n".join(lines) + "\n")
 
     print(f"Wrote unified benchmark results to {out_path}")
     return 0
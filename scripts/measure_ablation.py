@@ -1,17 +1,27 @@
 #!/usr/bin/env python3
 
 import argparse
+import atexit
+import collections
+import contextlib
 import csv
 import concurrent.futures
+import functools
+import io
+import os
 import re
+import shutil
+import signal
+import statistics
 import subprocess
 import sys
+import threading
 import time
 from dataclasses import dataclass
 from pathlib import Path
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Bench:
     name: str
     schema: str
@@ -27,7 +37,7 @@ class Bench:
     enable_bitlist_null: bool = False
 
 
-BENCHES = [
+BENCHES = (
     # Canonical fuzz benchmarks (one per independent bug class).
     Bench("BV-DirtyPadding", "BeaconStateBench", "benchschemas", "FSSZ-INT-01", True),
     Bench("Bool-Dirty", "ValidatorEnvelope", "benchschemas", "FSSZ-222"),
@@ -173,7 +183,7 @@ BENCHES = [
         oracle_bug="PSSZ-116",
         schema_validate=True,
     ),
-]
+)
 
 MODES = [
     ("full", "rl"),
@@ -181,89 +191,180 @@ MODES = [
     ("nospec", "baseline"),
 ]
 
-
-def run(cmd: list[str], cwd: Path | None = None, timeout_s: float | None = None) -> str:
-    try:
-        proc = subprocess.run(
+# Resolved once so every go invocation skips the PATH search.
+GO_BIN = shutil.which("go") or "go"
+
+RESULT_FIELDNAMES = (
+    "benchmark",
+    "category",
+    "schema",
+    "mode_label",
+    "mode",
+    "result",
+    "duration_ms",
+    "coverage",
+    "step",
+)
+
+# Only this much subprocess output is retained for error messages.
+OUTPUT_TAIL_LINES = 200
+OUTPUT_TAIL_CHARS = 8000
+
+SSZGEN_DIFF_RE = re.compile(rb"^diff --git[^\r\n]*/sszgen/", re.M)
+MODE_LINE_RE = re.compile(r"\b(MODE|SCHEMA|RESULT|STEP|DURATION|COVERAGE)=(\S*)")
+CODEGEN_ERROR_RE = re.compile(r"sszgen/testcases|benchschemas|schemas|sszgen/generator")
+HASH_LINE_RE = re.compile(r"^\s*// Hash:[ \t]*(.*?)\s*$", re.M)
+# Two-letter units come first so "ms" is not read as minutes.
+DURATION_RE = re.compile(r"^\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)(ms|µs|us|ns|s|m|h)$")
+DURATION_UNITS_MS = {
+    "ms": (1.0, 1.0),
+    "µs": (1.0, 1000.0),
+    "us": (1.0, 1000.0),
+    "ns": (1.0, 1_000_000.0),
+    "s": (1000.0, 1.0),
+    "m": (60_000.0, 1.0),
+    "h": (3_600_000.0, 1.0),
+}
+
+
+# Each subprocess gets its own process group so a timeout also takes down
+# grandchildren (go compilers, go run binaries) instead of orphaning them. Being
+# in their own session, they also never see the terminal's SIGINT, so every
+# exit path has to kill them explicitly.
+if os.name == "posix":
+    _NEW_GROUP_KWARGS: dict = {"start_new_session": True}
+else:
+    _NEW_GROUP_KWARGS = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+
+_LIVE_PROCS: set[subprocess.Popen] = set()
+_LIVE_PROCS_LOCK = threading.Lock()
+# Set once the live groups are being killed; no new command may start after.
+_STOPPING = False
+
+
+def _kill_group(proc: subprocess.Popen) -> None:
+    if os.name == "posix":
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    else:
+        try:
+            proc.send_signal(signal.CTRL_BREAK_EVENT)
+        except OSError:
+            pass
+        proc.kill()
+
+
+@atexit.register
+def _kill_live_procs() -> None:
+    global _STOPPING
+    with _LIVE_PROCS_LOCK:
+        _STOPPING = True
+        procs = list(_LIVE_PROCS)
+    for proc in procs:
+        if proc.poll() is None:
+            _kill_group(proc)
+
+
+def _format_tail(lines: collections.deque, seen: int) -> str:
+    output = "".join(lines)
+    if seen > len(lines) or len(output) > OUTPUT_TAIL_CHARS:
+        output = f"...truncated...\n{output[-OUTPUT_TAIL_CHARS:]}"
+    return output
+
+
+def run(
+    cmd: list[str],
+    cwd: Path | None = None,
+    timeout_s: float | None = None,
+    marker: str | None = None,
+) -> tuple[str, str | None]:
+    # Stream output so only the tail (and the last marker line) stays in memory.
+    # Spawning under the lock means _kill_live_procs either sees the new proc or
+    # stops it from starting.
+    with _LIVE_PROCS_LOCK:
+        if _STOPPING:
+            raise RuntimeError(f"Not starting command during shutdown: {' '.join(cmd)}")
+        proc = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             text=True,
+            bufsize=1,
             cwd=str(cwd) if cwd else None,
-            timeout=timeout_s,
+            **_NEW_GROUP_KWARGS,
         )
-    except subprocess.TimeoutExpired as exc:
-        output = (exc.stdout or "") if isinstance(exc.stdout, str) else ""
-        if len(output) > 8000:
-            output = f"...truncated...\n{output[-8000:]}"
-        raise RuntimeError(f"Command timed out after {timeout_s}s: {' '.join(cmd)}\n{output}") from exc
+        _LIVE_PROCS.add(proc)
+    tail: collections.deque = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+    seen = 0
+    marked: str | None = None
+
+    def drain() -> None:
+        nonlocal seen, marked
+        for line in proc.stdout:
+            seen += 1
+            tail.append(line)
+            if marker and line.startswith(marker):
+                marked = line.rstrip("\n")
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    try:
+        proc.wait(timeout=timeout_s)
+    except BaseException as exc:
+        # Timeout, Ctrl-C or anything else: take the whole group down first.
+        _kill_group(proc)
+        proc.wait()
+        reader.join()
+        if isinstance(exc, subprocess.TimeoutExpired):
+            raise RuntimeError(
+                f"Command timed out after {timeout_s}s: {' '.join(cmd)}\n{_format_tail(tail, seen)}"
+            ) from exc
+        raise
+    finally:
+        # A proc that could not be reaped stays tracked for the atexit hook.
+        if proc.returncode is not None:
+            with _LIVE_PROCS_LOCK:
+                _LIVE_PROCS.discard(proc)
+    reader.join()
     if proc.returncode != 0:
-        output = proc.stdout or ""
-        if len(output) > 8000:
-            output = f"...truncated...\n{output[-8000:]}"
-        raise RuntimeError(f"Command failed ({proc.returncode}): {' '.join(cmd)}\n{output}")
-    return proc.stdout
+        raise RuntimeError(f"Command failed ({proc.returncode}): {' '.join(cmd)}\n{_format_tail(tail, seen)}")
+    return "".join(tail), marked
 
 
 def parse_duration_ms(value: str) -> float:
-    if value.endswith("ms"):
-        return float(value[:-2])
-    if value.endswith("µs"):
-        return float(value[:-2]) / 1000.0
-    if value.endswith("us"):
-        return float(value[:-2]) / 1000.0
-    if value.endswith("ns"):
-        return float(value[:-2]) / 1_000_000.0
-    if value.endswith("s"):
-        return float(value[:-1]) * 1000.0
-    if value.endswith("m"):
-        return float(value[:-1]) * 60_000.0
-    if value.endswith("h"):
-        return float(value[:-1]) * 3_600_000.0
-    raise ValueError(f"unsupported duration format: {value}")
-
-
-def parse_measure_output(output: str) -> dict:
-    lines = output.strip().splitlines()
-    for line in reversed(lines):
-        if not line.startswith("MODE="):
-            continue
-        parts = line.split()
-        kv = {}
-        for part in parts:
-            if "=" not in part:
-                continue
-            k, v = part.split("=", 1)
-            kv[k] = v
-        if "MODE" not in kv or "SCHEMA" not in kv or "RESULT" not in kv or "DURATION" not in kv or "COVERAGE" not in kv:
-            raise ValueError(f"unable to parse measurement line: {line}")
-        return {
-            "mode": kv["MODE"],
-            "schema": kv["SCHEMA"],
-            "result": kv["RESULT"],
-            "step": int(kv["STEP"]) if "STEP" in kv else None,
-            "duration_ms": parse_duration_ms(kv["DURATION"]),
-            "coverage": int(kv["COVERAGE"]),
-        }
-    raise ValueError(f"no measurement line found in output:\n{output}")
+    m = DURATION_RE.match(value)
+    if m is None:
+        raise ValueError(f"unsupported duration format: {value}")
+    mul, div = DURATION_UNITS_MS[m.group(2)]
+    return float(m.group(1)) * mul / div
+
+
+def parse_measure_output(line: str | None, output: str = "") -> dict:
+    if line is None:
+        raise ValueError(f"no measurement line found in output:\n{output}")
+    kv = dict(MODE_LINE_RE.findall(line))
+    if "MODE" not in kv or "SCHEMA" not in kv or "RESULT" not in kv or "DURATION" not in kv or "COVERAGE" not in kv:
+        raise ValueError(f"unable to parse measurement line: {line}")
+    return {
+        "mode": kv["MODE"],
+        "schema": kv["SCHEMA"],
+        "result": kv["RESULT"],
+        "step": int(kv["STEP"]) if "STEP" in kv else None,
+        "duration_ms": parse_duration_ms(kv["DURATION"]),
+        "coverage": int(kv["COVERAGE"]),
+    }
 
 
 def is_codegen_compile_error(output: str) -> bool:
-    return any(
-        needle in output
-        for needle in (
-            "sszgen/testcases",
-            "benchschemas",
-            "schemas",
-            "sszgen/generator",
-        )
-    )
+    return CODEGEN_ERROR_RE.search(output) is not None
 
 
 def toggle_bug(action: str, bug: str, repo_root: Path) -> None:
     cmd = [str(repo_root / "scripts" / "bug_toggle.sh"), action, bug]
     try:
-        output = run(cmd)
+        output, _ = run(cmd)
         print(output.strip())
     except RuntimeError as exc:
         print(exc)
@@ -274,7 +375,7 @@ def regenerate_benchschemas(repo_root: Path, timeout_s: float) -> bool:
     try:
         run(
             [
-                "go",
+                GO_BIN,
                 "run",
                 str(repo_root / "workspace" / "fastssz_bench" / "sszgen" / "main.go"),
                 "-path",
@@ -290,7 +391,7 @@ def regenerate_benchschemas(repo_root: Path, timeout_s: float) -> bool:
                 continue
             run(
                 [
-                    "go",
+                    GO_BIN,
                     "run",
                     str(repo_root / "cmd" / "instrumentor" / "main.go"),
                     "-file",
@@ -306,7 +407,7 @@ def regenerate_benchschemas(repo_root: Path, timeout_s: float) -> bool:
 def regenerate_testcases(repo_root: Path, filename: str, timeout_s: float) -> bool:
     try:
         run(
-            ["go", "generate", filename],
+            [GO_BIN, "generate", filename],
             cwd=repo_root / "workspace" / "fastssz_bench" / "sszgen" / "testcases",
             timeout_s=timeout_s,
         )
@@ -316,25 +417,37 @@ def regenerate_testcases(repo_root: Path, filename: str, timeout_s: float) -> bo
     return True
 
 
+def read_generated(path: Path) -> str | None:
+    # Never cached: every read follows a regeneration, and a rewrite can keep
+    # both size and (on coarse filesystems) mtime.
+    try:
+        return path.read_text()
+    except FileNotFoundError:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _receiver_patterns(type_name: str) -> tuple[re.Pattern, re.Pattern]:
+    name = re.escape(type_name)
+    return (
+        re.compile(rf"func\s*\([^)]*\*{name}\)"),
+        re.compile(rf"func\s*\([^)]*\b{name}\b\)"),
+    )
+
+
 def read_hash_line(path: Path) -> str | None:
-    if not path.exists():
+    text = read_generated(path)
+    if text is None:
         return None
-    for line in path.read_text().splitlines():
-        line = line.strip()
-        if line.startswith("// Hash:"):
-            return line.split(":", 1)[1].strip()
-    return None
+    m = HASH_LINE_RE.search(text)
+    return m.group(1) if m else None
 
 
 def generated_has_receiver(path: Path, type_name: str) -> bool:
-    if not path.exists():
+    text = read_generated(path)
+    if text is None:
         return False
-    text = path.read_text()
-    pattern = rf"func\s*\([^)]*\*{re.escape(type_name)}\)"
-    if re.search(pattern, text):
-        return True
-    pattern = rf"func\s*\([^)]*\b{re.escape(type_name)}\b\)"
-    return re.search(pattern, text) is not None
+    return any(pattern.search(text) for pattern in _receiver_patterns(type_name))
 
 
 def detect_codegen_bug(bench: Bench, repo_root: Path, gen_timeout_s: float) -> tuple[bool, str]:
@@ -347,9 +460,9 @@ def detect_codegen_bug(bench: Bench, repo_root: Path, gen_timeout_s: float) -> t
         return False, ""
     if bench.bug == "FSSZ-49":
         gen_file = repo_root / "workspace" / "fastssz_bench" / "sszgen" / "testcases" / "case3_encoding.go"
-        if not gen_file.exists():
+        text = read_generated(gen_file)
+        if text is None:
             return False, ""
-        text = gen_file.read_text()
         if "sszgen/testcases/other" not in text or "other.Case3B" not in text:
             return True, "duplicate name resolution failed"
         return False, ""
@@ -372,6 +485,7 @@ def detect_codegen_bug(bench: Bench, repo_root: Path, gen_timeout_s: float) -> t
     return False, ""
 
 
+@functools.lru_cache(maxsize=None)
 def patch_path_for_bug(bug: str, repo_root: Path) -> Path:
     patches_dir = repo_root / "patches"
     if bug in {"FSSZ-INT-01", "fssz-int-01"}:
@@ -387,21 +501,52 @@ def patch_path_for_bug(bug: str, repo_root: Path) -> Path:
     raise ValueError(f"unknown bug id: {bug}")
 
 
+@functools.lru_cache(maxsize=None)
 def patch_requires_codegen(bug: str, repo_root: Path) -> bool:
     patch_path = patch_path_for_bug(bug, repo_root)
-    if not patch_path.exists():
-        raise FileNotFoundError(f"patch file not found: {patch_path}")
-    for line in patch_path.read_text().splitlines():
-        if line.startswith("diff --git") and "/sszgen/" in line:
-            return True
-    return False
+    try:
+        data = patch_path.read_bytes()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"patch file not found: {patch_path}") from None
+    return SSZGEN_DIFF_RE.search(data) is not None
+
+
+def measure_binary_is_fresh(repo_root: Path, bin_path: Path) -> bool:
+    # Bug toggles and regeneration rewrite Go sources between benches, so the
+    # binary is only reused while no module input is newer than it.
+    try:
+        built_at = bin_path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    for name in ("go.mod", "go.sum"):
+        try:
+            if (repo_root / name).stat().st_mtime > built_at:
+                return False
+        except FileNotFoundError:
+            continue
+    for dirpath, dirnames, filenames in os.walk(repo_root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            if filename.endswith(".go") and os.path.getmtime(os.path.join(dirpath, filename)) > built_at:
+                return False
+    return True
+
+
+def codegen_group(bench: Bench, repo_root: Path) -> tuple[str, str] | None:
+    if not bench.bug or bench.schema_source not in ("benchschemas", "testcases"):
+        return None
+    if bench.schema_source == "testcases" and not bench.testcase_file:
+        return None
+    if not patch_requires_codegen(bench.bug, repo_root):
+        return None
+    return bench.schema_source, bench.testcase_file or ""
 
 
 def build_measure_binary(repo_root: Path, out_path: Path, timeout_s: float) -> bool:
     out_path.parent.mkdir(parents=True, exist_ok=True)
     try:
         run(
-            ["go", "build", "-o", str(out_path), "./cmd/measure"],
+            [GO_BIN, "build", "-o", str(out_path), "./cmd/measure"],
             cwd=repo_root,
             timeout_s=timeout_s,
         )
@@ -411,6 +556,25 @@ def build_measure_binary(repo_root: Path, out_path: Path, timeout_s: float) -> b
     return True
 
 
+def bench_flags(bench: Bench) -> tuple[str, ...]:
+    flags: list[str] = []
+    if bench.oracle:
+        flags += ["-oracle", bench.oracle]
+    if bench.oracle_bug:
+        flags += ["-oracle-bug", bench.oracle_bug]
+    if bench.schema_validate:
+        flags.append("-schema-validate")
+    if bench.disable_tail:
+        flags.append("-no-tail")
+    if bench.disable_gap:
+        flags.append("-no-gap")
+    if bench.enable_bitlist_null:
+        flags.append("-bitlist-null")
+    if bench.require_bitvector:
+        flags.append("-require-bitvector-bug")
+    return tuple(flags)
+
+
 def run_mode_trials(
     bench: Bench,
     measure_bin: Path,
@@ -419,73 +583,61 @@ def run_mode_trials(
     budget_ms: float,
     run_timeout_s: float,
     args: argparse.Namespace,
+    extra_flags: tuple[str, ...],
 ) -> dict:
-    durations: list[float] = []
-    coverages: list[int] = []
-    steps: list[int] = []
+    trials = max(1, args.trials)
+    durations: list[float] = [0.0] * trials
+    coverages: list[int] = [0] * trials
+    steps: list[int] = [0] * trials
     found_any = False
-    for _ in range(max(1, args.trials)):
+    cmd = [
+        str(measure_bin),
+        "-schema",
+        bench.schema,
+        "-mode",
+        mode,
+        "-budget",
+        args.budget,
+        "-max-steps",
+        str(args.max_steps),
+        "-batch-size",
+        str(args.batch_size),
+        *extra_flags,
+    ]
+
+    for i in range(trials):
         trial_start = time.time()
-        cmd = [
-            str(measure_bin),
-            "-schema",
-            bench.schema,
-            "-mode",
-            mode,
-            "-budget",
-            args.budget,
-            "-max-steps",
-            str(args.max_steps),
-            "-batch-size",
-            str(args.batch_size),
-        ]
-        if bench.oracle:
-            cmd.extend(["-oracle", bench.oracle])
-        if bench.oracle_bug:
-            cmd.extend(["-oracle-bug", bench.oracle_bug])
-        if bench.schema_validate:
-            cmd.append("-schema-validate")
-        if bench.disable_tail:
-            cmd.append("-no-tail")
-        if bench.disable_gap:
-            cmd.append("-no-gap")
-        if bench.enable_bitlist_null:
-            cmd.append("-bitlist-null")
-        if bench.require_bitvector:
-            cmd.append("-require-bitvector-bug")
-
         try:
-            output = run(cmd, timeout_s=run_timeout_s)
+            output, mode_line = run(cmd, timeout_s=run_timeout_s, marker="MODE=")
         except RuntimeError as exc:
             err_output = str(exc)
+            # Check the timeout first: its message carries the output tail, which
+            # can mention schemas without being a compile error.
+            if err_output.startswith("Command timed out"):
+                durations[i] = budget_ms
+                continue
             if is_codegen_compile_error(err_output):
                 found_any = True
-                durations.append((time.time() - trial_start) * 1000.0)
-                coverages.append(0)
-                steps.append(0)
-                continue
-            if "Command timed out" in err_output:
-                durations.append(budget_ms)
-                coverages.append(0)
-                steps.append(0)
+                durations[i] = (time.time() - trial_start) * 1000.0
                 continue
             raise
 
-        parsed = parse_measure_output(output)
+        parsed = parse_measure_output(mode_line, output)
         if parsed["result"] == "bug":
             found_any = True
-            durations.append(parsed["duration_ms"])
+            durations[i] = parsed["duration_ms"]
         else:
-            durations.append(budget_ms)
-        coverages.append(parsed["coverage"])
-        steps.append(parsed["step"] or 0)
-
-    durations.sort()
-    coverages.sort()
-    steps.sort()
-    median_duration = durations[len(durations) // 2]
-    median_coverage = coverages[len(coverages) // 2]
-    median_steps = steps[len(steps) // 2]
+            durations[i] = budget_ms
+        coverages[i] = parsed["coverage"]
+        steps[i] = parsed["step"] or 0
+
+    if trials == 1:
+        median_duration, median_coverage, median_steps = durations[0], coverages[0], steps[0]
+    else:
+        # median_high matches the previous sorted[n // 2] pick for even trial counts.
+        median_duration = statistics.median_high(durations)
+        median_coverage = statistics.median_high(coverages)
+        median_steps = statistics.median_high(steps)
     return {
         "mode_label": mode_label,
         "mode": mode,
@@ -496,6 +648,182 @@ def run_mode_trials(
     }
 
 
+# One mode pool per process, reused across benches. Keyed by pid because a
+# forked pool worker inherits the parent's executor without its threads.
+_MODE_EXECUTORS: dict[int, concurrent.futures.ThreadPoolExecutor] = {}
+
+
+def mode_executor() -> concurrent.futures.ThreadPoolExecutor:
+    pid = os.getpid()
+    executor = _MODE_EXECUTORS.get(pid)
+    if executor is None:
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(MODES), thread_name_prefix="mode"
+        )
+        _MODE_EXECUTORS[pid] = executor
+    return executor
+
+
+def shutdown_mode_executor() -> None:
+    executor = _MODE_EXECUTORS.pop(os.getpid(), None)
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _run_mode_row(
+    bench: Bench,
+    category: str,
+    extra_flags: tuple[str, ...],
+    measure_bin: Path,
+    mode_label: str,
+    mode: str,
+    budget_ms: float,
+    run_timeout_s: float,
+    args: argparse.Namespace,
+) -> dict:
+    parsed = run_mode_trials(
+        bench, measure_bin, mode_label, mode, budget_ms, run_timeout_s, args, extra_flags
+    )
+    return {"benchmark": bench.name, "category": category, "schema": bench.schema, **parsed}
+
+
+def _emit_failure_rows(
+    results: list[dict], bench: Bench, category: str, elapsed_ms: float, reason: str
+) -> None:
+    for label, mode in MODES:
+        results.append(
+            {
+                "benchmark": bench.name,
+                "category": category,
+                "schema": bench.schema,
+                "mode_label": label,
+                "mode": mode,
+                "result": "bug",
+                "duration_ms": elapsed_ms,
+                "coverage": 0,
+                "step": 0,
+            }
+        )
+        print(f"  {label}: result=bug tte_ms={elapsed_ms:.2f} coverage=0 ({reason})")
+
+
+def restore_codegen_output(bench: Bench, repo_root: Path, gen_timeout_s: float) -> None:
+    if bench.schema_source == "benchschemas":
+        regenerate_benchschemas(repo_root, gen_timeout_s)
+    elif bench.schema_source == "testcases":
+        if not bench.testcase_file:
+            raise ValueError(f"missing testcase file for {bench.name}")
+        regenerate_testcases(repo_root, bench.testcase_file, gen_timeout_s)
+
+
+def run_one_bench(
+    bench: Bench,
+    args: argparse.Namespace,
+    repo_root: Path,
+    measure_bin: Path,
+    budget_ms: float,
+    run_timeout_s: float,
+    gen_timeout_s: float,
+    build_timeout_s: float,
+    restore_codegen: bool = True,
+) -> list[dict]:
+    results: list[dict] = []
+    print(f"==> Benchmark {bench.name} ({bench.schema})")
+    bench_start = time.time()
+    category = "schema" if bench.schema_validate else "fuzz"
+    regen_needed = False
+    regen_ok = True
+    if bench.bug:
+        regen_needed = patch_requires_codegen(bench.bug, repo_root)
+
+    try:
+        if bench.bug:
+            toggle_bug("activate", bench.bug, repo_root)
+        if regen_needed:
+            if bench.schema_source == "benchschemas":
+                regen_ok = regenerate_benchschemas(repo_root, gen_timeout_s)
+            elif bench.schema_source == "testcases":
+                if not bench.testcase_file:
+                    raise ValueError(f"missing testcase file for {bench.name}")
+                regen_ok = regenerate_testcases(repo_root, bench.testcase_file, gen_timeout_s)
+
+        if regen_needed and not regen_ok:
+            elapsed_ms = (time.time() - bench_start) * 1000.0
+            _emit_failure_rows(results, bench, category, elapsed_ms, "regen failure")
+            return results
+
+        codegen_bug, reason = detect_codegen_bug(bench, repo_root, gen_timeout_s)
+        if codegen_bug:
+            elapsed_ms = (time.time() - bench_start) * 1000.0
+            _emit_failure_rows(results, bench, category, elapsed_ms, reason)
+            return results
+
+        build_ok = measure_binary_is_fresh(repo_root, measure_bin) or build_measure_binary(
+            repo_root, measure_bin, build_timeout_s
+        )
+        if not build_ok:
+            elapsed_ms = (time.time() - bench_start) * 1000.0
+            _emit_failure_rows(results, bench, category, elapsed_ms, "build failure")
+            return results
+
+        extra_flags = bench_flags(bench)
+        mode_rows = mode_executor().map(
+            lambda mode_spec: _run_mode_row(
+                bench, category, extra_flags, measure_bin, *mode_spec, budget_ms, run_timeout_s, args
+            ),
+            MODES,
+        )
+        for row in mode_rows:
+            results.append(row)
+            print(
+                f"  {row['mode_label']}: result={row['result']} "
+                f"tte_ms={row['duration_ms']:.2f} coverage={row['coverage']}"
+            )
+    finally:
+        if bench.bug:
+            try:
+                toggle_bug("deactivate", bench.bug, repo_root)
+            except RuntimeError:
+                pass
+        if regen_needed and restore_codegen:
+            restore_codegen_output(bench, repo_root, gen_timeout_s)
+    return results
+
+
+def sort_results_csv(path: Path, benches: list[Bench]) -> None:
+    # Rows are appended in completion order; rewrite the file in bench-table
+    # order, atomically so the appended copy survives a failure here.
+    order = {bench.name: i for i, bench in enumerate(benches)}
+    name_col = RESULT_FIELDNAMES.index("benchmark")
+    with path.open(newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        rows = sorted(reader, key=lambda row: order.get(row[name_col], len(order)))
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        if header is not None:
+            writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def _run_captured(run_bench, bench: Bench) -> tuple[list[dict], str]:
+    # Hold a worker's log until its rows are merged so benches do not interleave.
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            rows = run_bench(bench)
+    except KeyboardInterrupt:
+        # Ctrl-C reaches pool workers too; stop their mode runs before unwinding.
+        _kill_live_procs()
+        raise
+    except Exception as exc:
+        # The parent only gets the exception back, so carry the bench's log with it.
+        raise RuntimeError(f"Benchmark {bench.name} failed: {exc}\n{buf.getvalue()}") from exc
+    return rows, buf.getvalue()
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Measure ablation study results.")
     parser.add_argument("--budget", default="30s", help="Budget per run (Go duration)")
@@ -506,180 +834,126 @@ def main() -> int:
     parser.add_argument("--gen-timeout", default="5s", help="Timeout for codegen/regeneration commands")
     parser.add_argument("--build-timeout", default="5s", help="Timeout for building the measure binary")
     parser.add_argument("--only", default="", help="Comma-separated benchmark filters")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Benchmarks to run in parallel (repo-mutating benches always run serially). "
+            "Concurrent benches share the CPU, which skews time-to-error against a serial run"
+        ),
+    )
     args = parser.parse_args()
 
     repo_root = Path(__file__).resolve().parents[1]
     out_path = repo_root / args.out
 
-    results = []
     budget_ms = parse_duration_ms(args.budget)
     budget_s = budget_ms / 1000.0
     run_timeout_s = max(1.0, budget_s + 0.5)
     gen_timeout_s = parse_duration_ms(args.gen_timeout) / 1000.0
     build_timeout_s = parse_duration_ms(args.build_timeout) / 1000.0
 
-    benches = BENCHES
+    measure_bin = repo_root / ".tmp" / "measure"
+
+    benches = list(BENCHES)
     if args.only:
         tokens = [t.strip() for t in args.only.split(",") if t.strip()]
         if tokens:
             benches = [b for b in BENCHES if any(tok in b.name for tok in tokens)]
 
-    for bench in benches:
-        print(f"==> Benchmark {bench.name} ({bench.schema})")
-        bench_start = time.time()
-        category = "schema" if bench.schema_validate else "fuzz"
-        regen_needed = False
-        regen_ok = True
-        if bench.bug:
-            regen_needed = patch_requires_codegen(bench.bug, repo_root)
-
+    run_bench = functools.partial(
+        run_one_bench,
+        args=args,
+        repo_root=repo_root,
+        measure_bin=measure_bin,
+        budget_ms=budget_ms,
+        run_timeout_s=run_timeout_s,
+        gen_timeout_s=gen_timeout_s,
+        build_timeout_s=build_timeout_s,
+    )
+    # Rows are appended as each bench finishes so an interrupted sweep keeps its
+    # progress; the file is put back in bench-table order once the sweep ends.
+    # Only the fields the summary needs are kept in memory.
+    summary_rows: list[tuple[str, str, str, float, int | str]] = []
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
         try:
-            if bench.bug:
-                toggle_bug("activate", bench.bug, repo_root)
-            if regen_needed:
-                if bench.schema_source == "benchschemas":
-                    regen_ok = regenerate_benchschemas(repo_root, gen_timeout_s)
-                elif bench.schema_source == "testcases":
-                    if not bench.testcase_file:
-                        raise ValueError(f"missing testcase file for {bench.name}")
-                    regen_ok = regenerate_testcases(repo_root, bench.testcase_file, gen_timeout_s)
-
-            if regen_needed and not regen_ok:
-                elapsed_ms = (time.time() - bench_start) * 1000.0
-                for label, mode in MODES:
-                    results.append(
-                        {
-                            "benchmark": bench.name,
-                            "category": category,
-                            "schema": bench.schema,
-                            "mode_label": label,
-                            "mode": mode,
-                            "result": "bug",
-                            "duration_ms": elapsed_ms,
-                            "coverage": 0,
-                            "step": 0,
-                        }
-                    )
-                    print(f"  {label}: result=bug tte_ms={elapsed_ms:.2f} coverage=0 (regen failure)")
-                continue
-
-            codegen_bug, reason = detect_codegen_bug(bench, repo_root, gen_timeout_s)
-            if codegen_bug:
-                elapsed_ms = (time.time() - bench_start) * 1000.0
-                for label, mode in MODES:
-                    results.append(
-                        {
-                            "benchmark": bench.name,
-                            "category": category,
-                            "schema": bench.schema,
-                            "mode_label": label,
-                            "mode": mode,
-                            "result": "bug",
-                            "duration_ms": elapsed_ms,
-                            "coverage": 0,
-                            "step": 0,
-                        }
-                    )
-                    print(f"  {label}: result=bug tte_ms={elapsed_ms:.2f} coverage=0 ({reason})")
-                continue
-
-            measure_bin = repo_root / ".tmp" / f"measure_{bench.name}"
-            build_ok = build_measure_binary(repo_root, measure_bin, build_timeout_s)
-            if not build_ok:
-                elapsed_ms = (time.time() - bench_start) * 1000.0
-                for label, mode in MODES:
-                    results.append(
-                        {
-                            "benchmark": bench.name,
-                            "category": category,
-                            "schema": bench.schema,
-                            "mode_label": label,
-                            "mode": mode,
-                            "result": "bug",
-                            "duration_ms": elapsed_ms,
-                            "coverage": 0,
-                            "step": 0,
-                        }
-                    )
-                    print(f"  {label}: result=bug tte_ms={elapsed_ms:.2f} coverage=0 (build failure)")
-                continue
-
-            mode_results: dict[str, dict] = {}
-            with concurrent.futures.ThreadPoolExecutor(max_workers=len(MODES)) as executor:
-                future_map = {
-                    executor.submit(
-                        run_mode_trials,
-                        bench,
-                        measure_bin,
-                        label,
-                        mode,
-                        budget_ms,
-                        run_timeout_s,
-                        args,
-                    ): label
-                    for label, mode in MODES
-                }
-                for future in concurrent.futures.as_completed(future_map):
-                    parsed = future.result()
-                    mode_results[parsed["mode_label"]] = parsed
-
-            for label, mode in MODES:
-                parsed = mode_results[label]
-                results.append(
-                    {
-                        "benchmark": bench.name,
-                        "category": category,
-                        "schema": bench.schema,
-                        "mode_label": label,
-                        "mode": mode,
-                        **parsed,
-                    }
-                )
-                print(
-                    f"  {label}: result={parsed['result']} "
-                    f"tte_ms={parsed['duration_ms']:.2f} coverage={parsed['coverage']}"
-                )
+            with out_path.open("w", newline="", buffering=1) as f:
+                writer = csv.writer(f)
+                writer.writerow(RESULT_FIELDNAMES)
+
+                def record(rows: list[dict]) -> None:
+                    for row in rows:
+                        if row.get("coverage") is None:
+                            row["coverage"] = ""
+                        summary_rows.append(
+                            (row["mode_label"], row["category"], row["result"], row["duration_ms"], row["coverage"])
+                        )
+                    writer.writerows([row.get(k, "") for k in RESULT_FIELDNAMES] for row in rows)
+
+                def run_serial(seq: list[Bench]) -> None:
+                    # Cluster benches that regenerate the same output and restore the
+                    # clean output once per cluster instead of after every bench. The
+                    # restore runs on any exit, so a failed or interrupted bench never
+                    # leaves patched output behind.
+                    ordered = sorted(seq, key=lambda b: (b.schema_source, b.testcase_file or ""))
+                    groups = [codegen_group(b, repo_root) for b in ordered]
+                    dirty: Bench | None = None
+                    try:
+                        for i, bench in enumerate(ordered):
+                            if groups[i] is not None:
+                                dirty = bench
+                            rows = run_bench(bench, restore_codegen=groups[i] is None)
+                            next_group = groups[i + 1] if i + 1 < len(ordered) else None
+                            if dirty is not None and groups[i] != next_group:
+                                restore_codegen_output(dirty, repo_root, gen_timeout_s)
+                                dirty = None
+                            record(rows)
+                    finally:
+                        if dirty is not None:
+                            restore_codegen_output(dirty, repo_root, gen_timeout_s)
+
+                def run_pure(seq: list[Bench]) -> None:
+                    if not seq:
+                        return
+                    jobs = args.jobs
+                    if not (
+                        measure_binary_is_fresh(repo_root, measure_bin)
+                        or build_measure_binary(repo_root, measure_bin, build_timeout_s)
+                    ):
+                        jobs = 1
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                        captured = executor.map(
+                            functools.partial(_run_captured, run_bench), seq, chunksize=2
+                        )
+                        for rows, output in captured:
+                            sys.stdout.write(output)
+                            record(rows)
+
+                if args.jobs <= 1:
+                    run_serial(benches)
+                else:
+                    # Benches with a bug id patch and regenerate the shared tree, so
+                    # they run one at a time; the rest only exec the measure binary.
+                    run_serial([b for b in benches if b.bug])
+                    run_pure([b for b in benches if not b.bug])
         finally:
-            if bench.bug:
-                try:
-                    toggle_bug("deactivate", bench.bug, repo_root)
-                except RuntimeError:
-                    pass
-            if regen_needed:
-                if bench.schema_source == "benchschemas":
-                    regenerate_benchschemas(repo_root, gen_timeout_s)
-                elif bench.schema_source == "testcases":
-                    if not bench.testcase_file:
-                        raise ValueError(f"missing testcase file for {bench.name}")
-                    regenerate_testcases(repo_root, bench.testcase_file, gen_timeout_s)
+            # The appending handle is closed by now.
+            sort_results_csv(out_path, benches)
+    except KeyboardInterrupt:
+        # Mode threads are waiting on measure runs that never saw the SIGINT;
+        # kill them so shutting the executor down does not wait out every trial.
+        _kill_live_procs()
+        raise
+    finally:
+        shutdown_mode_executor()
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open("w", newline="") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "benchmark",
-                "category",
-                "schema",
-                "mode_label",
-                "mode",
-                "result",
-                "duration_ms",
-                "coverage",
-                "step",
-            ],
-        )
-        writer.writeheader()
-        for row in results:
-            if row.get("coverage") is None:
-                row["coverage"] = ""
-            writer.writerow(row)
-
-    def summarize(rows: list[dict], label: str, prefix: str) -> None:
-        bugs_found = sum(1 for r in rows if r["result"] == "bug")
-        tte_values = [r["duration_ms"] for r in rows]
+    def summarize(rows: list[tuple], label: str, prefix: str) -> None:
+        bugs_found = sum(1 for r in rows if r[2] == "bug")
+        tte_values = [r[3] for r in rows]
         avg_tte = sum(tte_values) / len(tte_values) if tte_values else 0.0
-        cov_values = [r["coverage"] for r in rows if isinstance(r.get("coverage"), (int, float))]
+        cov_values = [r[4] for r in rows if isinstance(r[4], (int, float))]
         avg_cov = sum(cov_values) / len(cov_values) if cov_values else 0.0
         print(
             f"[summary {prefix}] {label}: bugs_found={bugs_found} "
@@ -687,9 +961,9 @@ def main() -> int:
         )
 
     for label, _ in MODES:
-        rows = [r for r in results if r["mode_label"] == label]
+        rows = [r for r in summary_rows if r[0] == label]
         summarize(rows, label, "all")
-        fuzz_rows = [r for r in rows if r.get("category") == "fuzz"]
+        fuzz_rows = [r for r in rows if r[1] == "fuzz"]
         summarize(fuzz_rows, label, "fuzz")
 
     print(f"Results written to {out_path}")